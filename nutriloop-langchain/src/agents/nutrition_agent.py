@@ -1,37 +1,104 @@
 from langchain_classic.chains import LLMChain
 from langchain_core.prompts import PromptTemplate
-from langchain_classic.memory import ConversationBufferMemory
+from langchain_classic.memory import ConversationBufferWindowMemory
+
+# PromptTemplate parses the template string and validates its variables on
+# construction; the template is constant, so build it once per process rather
+# than once per agent.  {history} feeds the windowed memory back into the
+# model so regenerations can reference earlier exchanges.
+_MEAL_PLAN_PROMPT = PromptTemplate(
+    input_variables=["history", "preferences", "allergies", "budget"],
+    template=(
+        "You are a nutritionist tasked with creating a weekly meal plan. "
+        "Prior conversation:\n{history}\n\n"
+        "Consider the following preferences: {preferences}. "
+        "Avoid these allergens: {allergies}. "
+        "The budget is: {budget}. "
+        "Generate a meal plan for 7 days with breakfast, lunch, and dinner."
+    )
+)
 
 
 class NutritionAgent:
     def __init__(self, llm_client):
         self.llm_client = llm_client
-        self.memory = ConversationBufferMemory()
-        self.prompt_template = PromptTemplate(
-            input_variables=["preferences", "allergies", "budget"],
-            template=(
-                "You are a nutritionist tasked with creating a weekly meal plan. "
-                "Consider the following preferences: {preferences}. "
-                "Avoid these allergens: {allergies}. "
-                "The budget is: {budget}. "
-                "Generate a meal plan for 7 days with breakfast, lunch, and dinner."
-            )
+        # A bounded window keeps only the last k exchanges: an unbounded
+        # buffer ships the whole session history to the model on every call,
+        # so token cost and latency grow quadratically across a session.
+        # input_key is required on a multi-input chain — without it
+        # save_context cannot tell which key holds the user turn and raises.
+        self.memory = ConversationBufferWindowMemory(k=4, input_key="preferences")
+        self.prompt_template = _MEAL_PLAN_PROMPT
+        # Wiring the memory into the chain lets LangChain record and trim the
+        # history itself instead of this class appending messages by hand.
+        self.chain = (
+            LLMChain(llm=self.llm_client, prompt=_MEAL_PLAN_PROMPT, memory=self.memory)
+            if llm_client
+            else None
         )
-        self.chain = LLMChain(llm=self.llm_client, prompt=self.prompt_template) if llm_client else None
 
     def generate_meal_plan(self, preferences, allergies, budget):
-        self.memory.add_user_message(f"Preferences: {preferences}, Allergies: {allergies}, Budget: {budget}")
-
         if self.chain is None:
             meal_plan = (
                 "Sample meal plan unavailable without OPENAI_API_KEY. "
                 "Provide an API key for AI-generated content."
             )
+            # Without a chain the memory is maintained by hand so the stub
+            # path keeps the same conversational record.
+            self.memory.chat_memory.add_user_message(
+                f"Preferences: {preferences}, Allergies: {allergies}, Budget: {budget}"
+            )
+            self.memory.chat_memory.add_ai_message(meal_plan)
         else:
             meal_plan = self.chain.run(preferences=preferences, allergies=allergies, budget=budget)
 
-        self.memory.add_assistant_message(meal_plan)
         return meal_plan
 
+    async def agenerate_meal_plan(self, preferences, allergies, budget, abort_pattern=None, feedback=None):
+        """Stream the meal plan, abandoning generation early on an allergen hit.
+
+        The plan is accumulated chunk by chunk via ``astream`` and, when an
+        ``abort_pattern`` is supplied, the tail of the partial text is scanned
+        after each chunk.  On a match the stream is dropped immediately — the
+        remaining tokens are never generated — and the truncated plan is
+        returned for the validator to reject, so the retry starts without
+        waiting for a plan that is already known to be invalid.
+
+        ``feedback`` carries the previous attempt's rejection reason so a
+        retry is conditioned on the failure instead of rolling the dice again.
+        """
+        if self.llm_client is None:
+            return self.generate_meal_plan(preferences, allergies, budget)
+
+        prompt = self.prompt_template.format(
+            history=self.memory.load_memory_variables({}).get("history", ""),
+            preferences=preferences,
+            allergies=allergies,
+            budget=budget,
+        )
+        if feedback:
+            prompt += f" The previous plan was rejected because it {feedback}; fix that."
+        text = ""
+        async for chunk in self.llm_client.astream(prompt):
+            piece = chunk.content
+            if not piece:
+                continue
+            text += piece
+            # A bounded window is enough: allergen names are short, so any
+            # match spanning a chunk boundary sits inside the last 256 chars.
+            if abort_pattern is not None and abort_pattern.search(text[-256:]):
+                break
+        # The streaming path bypasses the chain, so record the exchange in
+        # the window memory by hand (mirroring the stub path above).  Only
+        # the compact input summary is saved — the rendered prompt embeds
+        # {history} itself, so storing it would nest prior prompts
+        # recursively and compound token cost across the retry loop.
+        user_turn = f"Preferences: {preferences}, Allergies: {allergies}, Budget: {budget}"
+        if feedback:
+            user_turn += f" (previous plan rejected because it {feedback})"
+        self.memory.chat_memory.add_user_message(user_turn)
+        self.memory.chat_memory.add_ai_message(text)
+        return text
+
     def get_memory(self):
-        return self.memory.get_messages()
+        return self.memory.load_memory_variables({})
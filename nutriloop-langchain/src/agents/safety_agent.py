@@ -1,30 +1,89 @@
-from langchain_classic.chains import LLMChain
-from langchain_core.prompts import PromptTemplate
+import re
+
+# A plain format string rather than a PromptTemplate: the shape is fixed and
+# two-variable, so str.format_map interpolates it directly without the
+# template machinery's per-call variable validation.
+_SAFETY_FMT = (
+    "You are a medical safety assistant. Given the following patient profile and goal, "
+    "assess whether the goal is medically safe. Respond with either 'safe' or 'unsafe' "
+    "and provide a brief explanation.\n\n"
+    "Patient Profile: {patient_profile}\n"
+    "Goal: {goal}\n"
+    "Is this goal safe?"
+)
+
+
+def render_safety(patient_profile: dict, goal: dict) -> str:
+    """Render the safety prompt for one patient."""
+    return _SAFETY_FMT.format_map({"patient_profile": patient_profile, "goal": goal})
+
+# Parses one numbered verdict line of a batched assessment, e.g.
+# "2: unsafe: target rate exceeds recommended weight loss".
+_BATCH_ROW_RE = re.compile(r'^(\d+):\s*(safe|unsafe):\s*(.*)$', re.IGNORECASE | re.MULTILINE)
 
 
 class SafetyAgent:
-    def __init__(self, llm_chain: LLMChain | None):
+    def __init__(self, llm_chain):
+        # An LCEL runnable (llm | StrOutputParser) mapping a rendered prompt
+        # string to the reply text, or None for the keyless stub.
         self.llm_chain = llm_chain
 
     def assess_goal_safety(self, patient_profile: dict, goal: dict) -> str:
-        prompt = PromptTemplate(
-            input_variables=["patient_profile", "goal"],
-            template=(
-                "You are a medical safety assistant. Given the following patient profile and goal, "
-                "assess whether the goal is medically safe. Respond with either 'safe' or 'unsafe' "
-                "and provide a brief explanation.\n\n"
-                "Patient Profile: {patient_profile}\n"
-                "Goal: {goal}\n"
-                "Is this goal safe?"
+        if self.llm_chain is None:
+            return (
+                "Safety assessment unavailable without OPENAI_API_KEY. "
+                "Provide an API key for AI-generated safety checks."
             )
-        )
 
+        messages = render_safety(patient_profile, goal)
+        response = self.llm_chain.invoke(messages)
+        return response.strip()
+
+    async def aassess_goal_safety(self, patient_profile: dict, goal: dict) -> str:
+        """Async twin of assess_goal_safety, via the runnable's native ainvoke."""
         if self.llm_chain is None:
             return (
                 "Safety assessment unavailable without OPENAI_API_KEY. "
                 "Provide an API key for AI-generated safety checks."
             )
 
-        messages = prompt.format(patient_profile=patient_profile, goal=goal)
-        response = self.llm_chain.run(messages)
+        messages = render_safety(patient_profile, goal)
+        response = await self.llm_chain.ainvoke(messages)
         return response.strip()
+
+    def assess_goal_safety_batch(self, profiles: list, goals: list) -> list:
+        """Assess several (profile, goal) pairs with one LLM round-trip.
+
+        Safety verdicts are short, so packing patients into one numbered
+        prompt amortizes the per-request overhead that per-patient calls
+        pay N times over — and sidesteps rate limits that pure concurrency
+        runs into.  Diminishing returns set in past roughly 8 patients per
+        prompt; callers should chunk larger cohorts.  Entries are None for
+        rows the response did not contain a parseable verdict for.
+        """
+        if self.llm_chain is None:
+            return [
+                "Safety assessment unavailable without OPENAI_API_KEY. "
+                "Provide an API key for AI-generated safety checks."
+            ] * len(profiles)
+
+        rows = "\n".join(
+            f"{i}. Profile: {profile} Goal: {goal}"
+            for i, (profile, goal) in enumerate(zip(profiles, goals), start=1)
+        )
+        prompt = (
+            "You are a medical safety assistant. For each patient below, assess "
+            "whether the goal is medically safe. Answer on its own line as "
+            "'N: safe: brief explanation' or 'N: unsafe: brief explanation'.\n\n"
+            f"{rows}"
+        )
+        response = self.llm_chain.invoke(prompt)
+
+        verdicts = {
+            int(num): f"{status}: {explanation}".strip()
+            for num, status, explanation in _BATCH_ROW_RE.findall(response)
+        }
+        # Rows the model skipped or mangled come back as None — callers must
+        # fall back to a per-patient assessment rather than fabricate (and
+        # potentially cache) a verdict the model never gave.
+        return [verdicts.get(i) for i in range(1, len(profiles) + 1)]
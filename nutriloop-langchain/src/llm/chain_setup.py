@@ -1,8 +1,24 @@
+from typing import Optional
+
 from langchain_classic.chains import LLMChain, SequentialChain
 from langchain_core.prompts import PromptTemplate
 
 from .client import LLMClient
 
+# One LLMClient is shared by every chain built here, so the safety and
+# meal-plan chains reuse the same underlying HTTP connection pool (and any
+# request-level caching) instead of each opening its own TLS session.
+_LLM_SINGLETON: Optional[LLMClient] = None
+
+
+def _get_llm() -> LLMClient:
+    """Return the process-wide ``LLMClient`` shared by all chains."""
+    global _LLM_SINGLETON
+    if _LLM_SINGLETON is None:
+        _LLM_SINGLETON = LLMClient()
+    return _LLM_SINGLETON
+
+
 def setup_chains():
     # Define prompt templates for different tasks
     safety_prompt = PromptTemplate(
@@ -15,14 +31,17 @@ def setup_chains():
         template="Create a weekly meal plan considering the following preferences: {preferences}, avoiding these allergies: {allergies}, and respecting a budget of {budget}."
     )
 
-    # Create LLM chains for safety assessment and meal planning
+    # Create LLM chains for safety assessment and meal planning, both backed
+    # by the shared client
+    shared_llm = _get_llm()
+
     safety_chain = LLMChain(
-        llm=LLMClient(),  # Assuming LLMClient is defined in client.py
+        llm=shared_llm.llm,
         prompt=safety_prompt
     )
 
     meal_plan_chain = LLMChain(
-        llm=LLMClient(),
+        llm=shared_llm.llm,
         prompt=meal_plan_prompt
     )
 
@@ -33,4 +52,4 @@ def setup_chains():
         output_variables=["safety_result", "meal_plan"]
     )
 
-    return overall_chain
\ No newline at end of file
+    return overall_chain
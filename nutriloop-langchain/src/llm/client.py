@@ -1,13 +1,70 @@
+import functools
 import os
-from typing import Optional
+from typing import List, Optional
 
+import httpx
+from langchain_community.cache import SQLiteCache
+from langchain_core.globals import set_llm_cache
 from langchain_openai import ChatOpenAI
 
 
+_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=32)
+
+
+def _default_http_client() -> httpx.Client:
+    """Build a keep-alive HTTP client (HTTP/2 when the ``h2`` extra is installed)."""
+    try:
+        return httpx.Client(http2=True, limits=_LIMITS)
+    except ImportError:
+        return httpx.Client(limits=_LIMITS)
+
+
+def _default_async_http_client() -> httpx.AsyncClient:
+    """Async twin of :func:`_default_http_client`.
+
+    ChatOpenAI keeps separate sync and async transports; ainvoke/astream/
+    abatch all go through the async one, so it needs the same keep-alive
+    pool or those calls fall back to a default per-model client.
+    """
+    try:
+        return httpx.AsyncClient(http2=True, limits=_LIMITS)
+    except ImportError:
+        return httpx.AsyncClient(limits=_LIMITS)
+
+
+@functools.lru_cache(maxsize=8)
+def _get_chat(model_name: str, temperature: float, api_key: str) -> ChatOpenAI:
+    """Process-wide memoized ChatOpenAI per (model, temperature, key).
+
+    Every LLMClient built with the same parameters shares one model object
+    and therefore one keep-alive connection pool, so repeated workflow runs
+    amortize the TLS handshake and tokenizer load instead of reopening a
+    session each time.  Tests needing isolation call _get_chat.cache_clear().
+    """
+    return ChatOpenAI(
+        model=model_name,
+        temperature=temperature,
+        api_key=api_key,
+        http_client=_default_http_client(),
+        http_async_client=_default_async_http_client(),
+        cache=temperature == 0,
+        streaming=True,
+    )
+
+
 class LLMClient:
     """Thin wrapper around ChatOpenAI with a stub fallback when no API key is present."""
 
-    def __init__(self, model_name: str = "gpt-4o-mini", temperature: float = 0):
+    # Set once the process-wide SQLite LLM cache has been installed.
+    _cache_configured = False
+
+    def __init__(
+        self,
+        model_name: str = "gpt-4o-mini",
+        temperature: float = 0,
+        http_client: Optional[httpx.Client] = None,
+        http_async_client: Optional[httpx.AsyncClient] = None,
+    ):
         api_key = os.getenv("OPENAI_API_KEY")
         self.is_stub = api_key is None or api_key.strip() == ""
 
@@ -15,14 +72,67 @@ class LLMClient:
             # Keep ``llm`` None to avoid raising inside ChatOpenAI when no key is provided.
             self.llm: Optional[ChatOpenAI] = None
         else:
-            self.llm = ChatOpenAI(
-                model=model_name,
-                temperature=temperature,
-                api_key=api_key,
-            )
+            self._ensure_llm_cache()
+            # Only deterministic (temperature=0) models read and write the
+            # cache — sampled outputs are meant to vary between calls.  An
+            # explicit http(_async)_client bypasses the memo and gets a
+            # dedicated model; otherwise identical configs share one via
+            # _get_chat.
+            if http_client is not None or http_async_client is not None:
+                self.llm = ChatOpenAI(
+                    model=model_name,
+                    temperature=temperature,
+                    api_key=api_key,
+                    http_client=http_client or _default_http_client(),
+                    http_async_client=http_async_client or _default_async_http_client(),
+                    cache=temperature == 0,
+                    streaming=True,
+                )
+            else:
+                self.llm = _get_chat(model_name, temperature, api_key)
+
+    @classmethod
+    def _ensure_llm_cache(cls) -> None:
+        """Install the on-disk LLM cache once per process.
+
+        Identical (patient_profile, goal) safety assessments and repeated
+        meal-plan prompts are idempotent at temperature=0, so after the
+        first invocation they become zero-latency SQLite hits instead of
+        API round-trips.
+        """
+        if cls._cache_configured:
+            return
+        set_llm_cache(SQLiteCache(os.getenv("NUTRILOOP_CACHE", ".llm_cache.db")))
+        cls._cache_configured = True
 
     def generate_response(self, prompt: str) -> str:
         if not self.llm:
             return "LLM unavailable: provide OPENAI_API_KEY to enable model responses."
         response = self.llm.invoke(prompt)
         return response.content.strip()
+
+    async def agenerate_batch(self, prompts: List[str], max_concurrency: int = 5) -> List[str]:
+        """Send several prompts through one batched call.
+
+        ``ChatOpenAI.abatch`` multiplexes the requests over the client's
+        shared HTTP session instead of paying per-call connection setup;
+        ``max_concurrency`` stays modest by default to avoid tripping
+        OpenAI's requests-per-minute limits.
+        """
+        if not self.llm:
+            return ["LLM unavailable: provide OPENAI_API_KEY to enable model responses."] * len(prompts)
+        responses = await self.llm.abatch(prompts, config={"max_concurrency": max_concurrency})
+        return [response.content.strip() for response in responses]
+
+    async def agenerate_stream(self, prompt: str):
+        """Yield response chunks as the model produces them.
+
+        Streaming lets callers start consuming (and validating) the output
+        before generation finishes instead of buffering the full reply.
+        """
+        if not self.llm:
+            yield "LLM unavailable: provide OPENAI_API_KEY to enable model responses."
+            return
+        async for chunk in self.llm.astream(prompt):
+            if chunk.content:
+                yield chunk.content
@@ -1,26 +1,33 @@
-from langchain_classic.chains import LLMChain
-from langchain_core.prompts import PromptTemplate
+from langchain_core.output_parsers import StrOutputParser
 from agents.nutrition_agent import NutritionAgent
 from agents.safety_agent import SafetyAgent
 from llm.client import LLMClient
 from orchestrator import Orchestrator
 
+# The chain re-wires runnables when built, so memoize it per llm instance
+# (keyed on identity — chat models are not hashable).
+_SAFETY_CHAIN_CACHE: dict = {}
+
+
+def _get_safety_chain(llm):
+    """LCEL runnable mapping a rendered prompt string to the reply text.
+
+    The legacy LLMChain wrapped every call in callback-manager setup; the
+    llm | StrOutputParser composition skips that and natively supports
+    ainvoke/abatch.  Prompt rendering stays in SafetyAgent (format_map),
+    so the runnable takes the finished string.
+    """
+    chain = _SAFETY_CHAIN_CACHE.get(id(llm))
+    if chain is None:
+        chain = llm | StrOutputParser()
+        _SAFETY_CHAIN_CACHE[id(llm)] = chain
+    return chain
+
 
 def main():
     llm_client = LLMClient().llm
 
-    safety_prompt = PromptTemplate(
-        input_variables=["patient_profile", "goal"],
-        template=(
-            "You are a medical safety assistant. Given the following patient profile and goal, "
-            "assess whether the goal is medically safe. Respond with either 'safe' or 'unsafe' "
-            "and provide a brief explanation.\n\n"
-            "Patient Profile: {patient_profile}\n"
-            "Goal: {goal}\n"
-            "Is this goal safe?"
-        ),
-    )
-    safety_chain = LLMChain(llm=llm_client, prompt=safety_prompt)
+    safety_chain = _get_safety_chain(llm_client) if llm_client is not None else None
 
     nutrition_agent = NutritionAgent(llm_client)
     safety_agent = SafetyAgent(safety_chain)
@@ -1,12 +1,22 @@
 from __future__ import annotations
 
-from typing import Dict, Literal, Optional, TypedDict
+import asyncio
+import hashlib
+import json
+from typing import Dict, List, Literal, Optional, TypedDict
 
-from langgraph.graph import END, StateGraph
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from langgraph.cache.memory import InMemoryCache
+from langgraph.graph import END, START, StateGraph
+from langgraph.types import CachePolicy
 
 from agents.nutrition_agent import NutritionAgent
 from agents.safety_agent import SafetyAgent
-from validators import derive_grocery_list, validate_meal_plan
+from validators import allergen_pattern, derive_grocery_list, validate_meal_plan
 
 
 class WorkflowState(TypedDict, total=False):
@@ -20,7 +30,54 @@ class WorkflowState(TypedDict, total=False):
     meal_plan: str
     validation_passed: bool
     validation_reason: str
+    retry_count: int
     grocery_list: Dict[str, int]
+    # Per-invocation agent carrying this patient's window memory; scoping it
+    # to the run keeps one patient's medical data out of another's prompt.
+    nutrition_agent: NutritionAgent
+
+
+# Bound on validate_plan -> generate_plan loops; past it the flow falls
+# through to finalize with validation_passed=False rather than re-paying
+# generation cost indefinitely.
+_MAX_RETRIES = 3
+
+# Patients packed into one row-marshalled safety prompt; past ~8 the
+# savings flatten out while parse errors creep up.
+_SAFETY_BATCH_SIZE = 8
+
+
+def _state_key(d: Dict[str, object]) -> str:
+    """Canonical 128-bit digest of a state slice for node-cache keys.
+
+    Sorted-key serialization makes the digest insensitive to dict insertion
+    order, so e.g. patient dicts built in a different field order still hit
+    the same cache entry; blake2b is noticeably faster than sha256 and 16
+    bytes is plenty for a cache key.
+    """
+    if orjson is not None:
+        payload = orjson.dumps(d, option=orjson.OPT_SORT_KEYS, default=str)
+    else:
+        payload = json.dumps(d, sort_keys=True, separators=(",", ":"), default=str).encode()
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+def _assess_goal_key(state: WorkflowState) -> str:
+    return _state_key({"patient_info": state.get("patient_info"), "goal": state.get("goal")})
+
+
+def _validate_plan_key(state: WorkflowState) -> str:
+    # retry_count is part of the key on purpose: a regenerated-but-identical
+    # plan must re-run validation so the retry counter keeps advancing
+    # toward the cap instead of replaying a stale cached delta forever.
+    return _state_key(
+        {
+            "meal_plan": state.get("meal_plan"),
+            "patient_info": state.get("patient_info"),
+            "preferences": state.get("preferences"),
+            "retry_count": state.get("retry_count", 0),
+        }
+    )
 
 
 class Orchestrator:
@@ -41,14 +98,36 @@ class Orchestrator:
     # ------------------------------------------------------------------
     def _build_flow(self):
         graph = StateGraph(WorkflowState)
-        graph.add_node("assess_goal", self._node_assess_goal)
+        # assess_goal and validate_plan are pure functions of their input
+        # slice, so unchanged inputs skip execution entirely: the safety
+        # node is not re-run for an identical (patient_info, goal) pair and
+        # validation short-circuits when a regeneration returns the same
+        # plan text.  generate_plan stays uncached — retries are supposed
+        # to produce a different plan.
+        # The explicit key funcs hash only the state slice each node reads
+        # (canonically serialized), so unrelated state churn and dict-order
+        # differences don't cause spurious cache misses.
+        graph.add_node(
+            "assess_goal",
+            self._node_assess_goal,
+            cache_policy=CachePolicy(key_func=_assess_goal_key, ttl=3600),
+        )
         graph.add_node("collect_preferences", self._node_collect_preferences)
         graph.add_node("generate_plan", self._node_generate_plan)
-        graph.add_node("validate_plan", self._node_validate_plan)
+        graph.add_node(
+            "validate_plan",
+            self._node_validate_plan,
+            cache_policy=CachePolicy(key_func=_validate_plan_key, ttl=600),
+        )
         graph.add_node("finalize", self._node_finalize)
 
-        graph.set_entry_point("assess_goal")
-        graph.add_edge("assess_goal", "collect_preferences")
+        # assess_goal and collect_preferences only depend on the initial
+        # state, so they fan out from START and run concurrently, fanning
+        # back in at generate_plan.  Wall-clock for the opening phase drops
+        # from t(safety) + t(prefs) to max(t(safety), t(prefs)).
+        graph.add_edge(START, "assess_goal")
+        graph.add_edge(START, "collect_preferences")
+        graph.add_edge("assess_goal", "generate_plan")
         graph.add_edge("collect_preferences", "generate_plan")
         graph.add_edge("generate_plan", "validate_plan")
         graph.add_conditional_edges(
@@ -61,66 +140,191 @@ class Orchestrator:
         )
         graph.add_edge("finalize", END)
 
-        return graph.compile()
+        return graph.compile(cache=InMemoryCache())
+
+    def _fresh_nutrition_agent(self) -> NutritionAgent:
+        """Build an agent with its own window memory for one invocation."""
+        return NutritionAgent(self.llm_client)
 
     # ------------------------------------------------------------------
     # Public entry point
     # ------------------------------------------------------------------
     def run_workflow(self, patient_info: Dict[str, object], goal: Dict[str, object]):
-        """Execute the compiled LangGraph workflow."""
+        """Execute the compiled LangGraph workflow (blocking wrapper)."""
+
+        return asyncio.run(self.arun_workflow(patient_info, goal))
+
+    async def arun_workflow(self, patient_info: Dict[str, object], goal: Dict[str, object]):
+        """Execute the compiled LangGraph workflow asynchronously.
+
+        ``ainvoke`` is required for the fan-out above: LangGraph only runs
+        sibling nodes concurrently when the graph is driven async.
+        """
 
         initial_state: WorkflowState = {
             "patient_info": patient_info,
             "goal": goal,
+            "nutrition_agent": self._fresh_nutrition_agent(),
         }
-        return self.flow.invoke(initial_state)
+        return await self.flow.ainvoke(initial_state)
+
+    async def run_many(
+        self,
+        jobs: List[tuple],
+        concurrency: int = 8,
+        batch_safety: bool = False,
+    ) -> List[WorkflowState]:
+        """Run the workflow for a cohort of (patient_info, goal) jobs.
+
+        Each patient's graph executes under ``asyncio.gather`` with a
+        semaphore bounding in-flight workflows, so the per-patient LLM
+        calls overlap without blowing past OpenAI's requests-per-minute
+        limits; tune ``concurrency`` to the account tier.
+
+        With ``batch_safety`` the safety checks are row-marshalled up
+        front — ``_SAFETY_BATCH_SIZE`` patients per prompt — and the
+        verdicts seeded into each initial state, so the per-patient
+        assess_goal node becomes a no-op and N short safety calls
+        collapse into ceil(N/8) round-trips.
+        """
+
+        jobs = list(jobs)
+        seeds: List[WorkflowState] = [
+            {
+                "patient_info": patient,
+                "goal": goal,
+                "nutrition_agent": self._fresh_nutrition_agent(),
+            }
+            for patient, goal in jobs
+        ]
+
+        if batch_safety and jobs:
+            assessments: List[str] = []
+            for start in range(0, len(jobs), _SAFETY_BATCH_SIZE):
+                chunk = jobs[start:start + _SAFETY_BATCH_SIZE]
+                assessments.extend(
+                    await asyncio.to_thread(
+                        self.safety_agent.assess_goal_safety_batch,
+                        [patient for patient, _ in chunk],
+                        [goal for _, goal in chunk],
+                    )
+                )
+            for seed, assessment in zip(seeds, assessments):
+                # None marks a row the batched response had no parseable
+                # verdict for; leave the seed unset so the per-patient node
+                # performs (and caches) a real assessment instead of a
+                # placeholder being stored under this patient's cache key.
+                if assessment is None:
+                    continue
+                seed["safety_status"] = "unsafe" if "unsafe" in assessment.lower() else "safe"
+                seed["safety_message"] = assessment
+
+        sem = asyncio.Semaphore(concurrency)
+
+        async def _one(seed: WorkflowState) -> WorkflowState:
+            async with sem:
+                return await self.flow.ainvoke(seed)
+
+        return await asyncio.gather(*(_one(seed) for seed in seeds))
+
+    async def run_workflow_many(
+        self,
+        patients: List[Dict[str, object]],
+        goals: List[Dict[str, object]],
+    ) -> List[WorkflowState]:
+        """Run the workflow for several patients concurrently.
+
+        Kept for callers holding parallel lists; delegates to ``run_many``.
+        """
+
+        return await self.run_many(list(zip(patients, goals)))
 
     # ------------------------------------------------------------------
     # Graph nodes
     # ------------------------------------------------------------------
-    def _node_assess_goal(self, state: WorkflowState) -> WorkflowState:
-        assessment = self.safety_agent.assess_goal_safety(state["patient_info"], state["goal"])
+    async def _node_assess_goal(self, state: WorkflowState) -> WorkflowState:
+        # A verdict seeded by run_many's batched safety pass skips the
+        # per-patient LLM call.  Return the verdict itself, not an empty
+        # delta: this node is cached on (patient_info, goal), and a later
+        # unseeded run for the same patient must find the real assessment
+        # under that key rather than a cached no-op.
+        if "safety_status" in state:
+            return {
+                "safety_status": state["safety_status"],
+                "safety_message": state.get("safety_message", ""),
+            }
+        # The runnable's native ainvoke keeps the call on the event loop, so
+        # collect_preferences executes in the same superstep with no worker
+        # thread.  Parallel nodes must return only the keys they own, so the
+        # two branches merge cleanly at the fan-in.
+        assessment = await self.safety_agent.aassess_goal_safety(
+            state["patient_info"], state["goal"]
+        )
         status: Literal["safe", "unsafe"] = "unsafe" if "unsafe" in assessment.lower() else "safe"
         return {
-            **state,
             "safety_status": status,
             "safety_message": assessment,
         }
 
-    def _node_collect_preferences(self, state: WorkflowState) -> WorkflowState:
+    async def _node_collect_preferences(self, state: WorkflowState) -> WorkflowState:
         preferences = self.gather_user_preferences(state.get("patient_info"))
-        return {**state, "preferences": preferences}
+        return {"preferences": preferences}
 
-    def _node_generate_plan(self, state: WorkflowState) -> WorkflowState:
+    async def _node_generate_plan(self, state: WorkflowState) -> WorkflowState:
         preferences: Dict[str, object] = state.get("preferences", {})
         allergies = preferences.get("allergies") or state.get("patient_info", {}).get("allergies", [])
         budget: Optional[float] = preferences.get("budget")  # type: ignore[arg-type]
-        meal_plan = self.nutrition_agent.generate_meal_plan(
+        retry_count = state.get("retry_count", 0)
+        if retry_count:
+            # Capped exponential backoff before regenerating — cheap insurance
+            # against hammering the API when validation keeps failing.
+            await asyncio.sleep(min(2 ** retry_count, 8))
+        # The per-invocation agent keeps this workflow's history (retries,
+        # feedback) isolated; concurrent cohort runs would otherwise
+        # interleave and cross-contaminate a process-wide window memory.
+        agent = state.get("nutrition_agent") or self.nutrition_agent
+        # Streaming overlaps generation with validation: the agent scans the
+        # partial plan as tokens arrive and aborts on an allergen hit, so a
+        # doomed plan triggers its retry without being generated in full.
+        meal_plan = await agent.agenerate_meal_plan(
             preferences.get("preferences", []),
             allergies,
             budget,
+            abort_pattern=allergen_pattern(allergies),
+            feedback=state.get("validation_reason") if retry_count else None,
         )
-        return {**state, "meal_plan": meal_plan}
+        # LangGraph merges returned deltas into state, so nodes hand back
+        # only the keys they produce — spreading **state here would copy
+        # the whole dict (meal_plan included) on every transition.
+        return {"meal_plan": meal_plan}
 
     def _node_validate_plan(self, state: WorkflowState) -> WorkflowState:
         allergies = state.get("preferences", {}).get("allergies") or state.get("patient_info", {}).get("allergies", [])
         budget: Optional[float] = state.get("preferences", {}).get("budget")  # type: ignore[arg-type]
         valid, reason = validate_meal_plan(state.get("meal_plan", ""), allergies, budget)
-        return {
-            **state,
+        delta: WorkflowState = {
             "validation_passed": valid,
             "validation_reason": reason,
         }
+        if not valid:
+            delta["retry_count"] = state.get("retry_count", 0) + 1
+        return delta
 
     def _node_finalize(self, state: WorkflowState) -> WorkflowState:
         grocery_list = derive_grocery_list(state.get("meal_plan", ""))
-        return {**state, "grocery_list": grocery_list}
+        return {"grocery_list": grocery_list}
 
     # ------------------------------------------------------------------
     # Conditional routing helpers
     # ------------------------------------------------------------------
     def _validation_branch(self, state: WorkflowState) -> Literal["retry", "approved"]:
-        return "approved" if state.get("validation_passed") else "retry"
+        if state.get("validation_passed"):
+            return "approved"
+        if state.get("retry_count", 0) >= _MAX_RETRIES:
+            # Give up after the cap: finalize with validation_passed=False so
+            # the caller can escalate (e.g. notify_doctor) instead of looping.
+            return "approved"
+        return "retry"
 
     # ------------------------------------------------------------------
     # External hooks (still stubs for now)
@@ -5,6 +5,13 @@ from langchain_core.prompts import PromptTemplate
 from langchain_classic.chains import LLMChain
 from langchain_classic.memory import ConversationBufferMemory
 
+# The template is constant, so parse it once at import; only the memory has
+# to stay per-session and is still created inside setup_calendar_agent.
+CALENDAR_PROMPT = PromptTemplate(
+    input_variables=["date", "time", "description"],
+    template="Schedule an appointment on {date} at {time} for {description}."
+)
+
 def schedule_appointment(date: str, time: str, description: str) -> str:
     """Schedule an appointment in the calendar."""
     # Here you would integrate with a calendar API to schedule the appointment.
@@ -22,9 +29,5 @@ def create_calendar_tool() -> Tool:
 def setup_calendar_agent() -> AgentExecutor:
     """Set up the calendar agent with LangChain."""
     memory = ConversationBufferMemory()
-    prompt = PromptTemplate(
-        input_variables=["date", "time", "description"],
-        template="Schedule an appointment on {date} at {time} for {description}."
-    )
-    llm_chain = LLMChain(prompt=prompt, memory=memory)
+    llm_chain = LLMChain(prompt=CALENDAR_PROMPT, memory=memory)
     return AgentExecutor(llm_chain=llm_chain, tools=[create_calendar_tool()])
\ No newline at end of file
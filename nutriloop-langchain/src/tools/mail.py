@@ -1,21 +1,24 @@
-from langchain_core.tools import Tool
+import logging
 
 from typing import List
 from langchain_core.tools import Tool
 
+# logging instead of print: formatting is skipped when INFO is disabled and
+# handler writes are buffered, so concurrent workflows no longer serialize
+# on the stdout lock just to record a simulated email.
+logger = logging.getLogger(__name__)
+
 
 def send_email_to_doctor(message: str, doctor_email: str) -> str:
     """Simulate sending an email to the doctor."""
-    log = f"[EMAIL → DOCTOR {doctor_email}] {message}"
-    print(log)
-    return log
+    logger.info("[EMAIL → DOCTOR %s] %s", doctor_email, message)
+    return f"[EMAIL → DOCTOR {doctor_email}] {message}"
 
 
 def send_email_to_patient(message: str, patient_email: str) -> str:
     """Simulate sending an email to the patient."""
-    log = f"[EMAIL → PATIENT {patient_email}] {message}"
-    print(log)
-    return log
+    logger.info("[EMAIL → PATIENT %s] %s", patient_email, message)
+    return f"[EMAIL → PATIENT {patient_email}] {message}"
 
 
 def create_mail_tools(doctor_email: str, patient_email: str) -> List[Tool]:
@@ -31,4 +34,4 @@ def create_mail_tools(doctor_email: str, patient_email: str) -> List[Tool]:
             func=lambda message: send_email_to_patient(message, patient_email),
             description="Send an email message to the patient."
         ),
-    ]
\ No newline at end of file
+    ]
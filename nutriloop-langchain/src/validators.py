@@ -1,3 +1,7 @@
+import re
+from collections import Counter
+from functools import lru_cache
+
 from langchain_core.output_parsers import BaseOutputParser
 from langchain_core.prompts import PromptTemplate
 from langchain_classic.chains import LLMChain
@@ -5,43 +9,65 @@ from langchain_classic.agents import AgentExecutor
 from langchain_core.tools import Tool
 from langchain_classic.memory import ConversationBufferMemory
 
+# One precompiled pattern tokenizes the whole plan in a single C-level pass:
+# each item follows a breakfast/lunch/dinner label and runs to the next
+# separator or end of line.
+_ITEM_RE = re.compile(r'(?i)(?:breakfast|lunch|dinner)\s*[–\-:]*\s*([^,;–\n]+)')
+
+# Separator junk that can cling to a captured item's edges (stray label
+# punctuation the character class above cannot exclude mid-item).
+_STRIP_CHARS = " \t–-:"
+
+@lru_cache(maxsize=128)
+def _allergen_re(allergens: tuple):
+    # One compiled alternation scans the plan in a single pass instead of one
+    # substring search per allergen; cached per (sorted, lowercased) tuple so
+    # retry loops reuse the compiled pattern.
+    if not allergens:
+        return None
+    return re.compile('|'.join(re.escape(a) for a in sorted(allergens, key=len, reverse=True)), re.IGNORECASE)
+
+
+def allergen_pattern(allergies: list):
+    """Compiled (and cached) alternation matching any of ``allergies``, or None."""
+    return _allergen_re(tuple(sorted({a.lower() for a in allergies})))
+
+
 def validate_meal_plan(plan: str, allergies: list, budget: float) -> tuple:
+    # Nothing to check — skip every pass over the plan text.
+    if not allergies and budget is None:
+        return (True, "")
+
     reasons = []
-    lower_plan = plan.lower()
-    
-    for allergen in allergies:
-        if allergen.lower() in lower_plan:
+    if len(allergies) == 1:
+        # Single allergen: CPython's C-level substring search beats firing
+        # up the regex engine, and casefold avoids lowercasing twice.
+        allergen = allergies[0]
+        if plan.casefold().find(allergen.casefold()) != -1:
             reasons.append(f"contains allergen '{allergen}'")
-    
+    elif allergies:
+        pattern = allergen_pattern(allergies)
+        hits = {m.group(0).lower() for m in pattern.finditer(plan)}
+        for allergen in allergies:
+            if allergen.lower() in hits:
+                reasons.append(f"contains allergen '{allergen}'")
+
     if budget is not None:
-        num_days = len([line for line in plan.splitlines() if line.strip()])
+        # map/filter keep the non-empty line count in C-level iteration.
+        # (plan.count('\n') would be cheaper still, but models pad plans
+        # with blank lines, which must not count as days.)
+        num_days = sum(1 for _ in filter(None, map(str.strip, plan.splitlines())))
         estimated_cost = num_days * 3 * 5
         if estimated_cost > budget:
             reasons.append(f"estimated cost {estimated_cost} exceeds budget {budget}")
-    
+
     return (len(reasons) == 0, "; ".join(reasons))
 
-def derive_grocery_list(plan: str) -> dict:
-    grocery_counts = {}
-    
-    for line in plan.splitlines():
-        if ':' in line:
-            _, meals_str = line.split(':', 1)
-        else:
-            meals_str = line
-        
-        for segment in meals_str.replace('–', ':').replace(';', ',').split(','):
-            item = segment.strip()
-            if not item:
-                continue
-            
-            for prefix in ["Breakfast", "Lunch", "Dinner"]:
-                if item.lower().startswith(prefix.lower()):
-                    item = item[len(prefix):].strip(" –-: ")
-            
-            key = item.lower()
-            if not key:
-                continue
-            grocery_counts[key] = grocery_counts.get(key, 0) + 1
-    
-    return grocery_counts
\ No newline at end of file
+def derive_grocery_list(plan: str) -> Counter:
+    # Returned as a Counter (a dict subclass, so callers see no difference)
+    # so that lists from several plans can be combined with += directly.
+    return Counter(
+        item
+        for item in (m.group(1).strip(_STRIP_CHARS).lower() for m in _ITEM_RE.finditer(plan))
+        if item
+    )
\ No newline at end of file